@@ -1,5 +1,17 @@
+import math
+
 import numpy as np
 
+# Numba is optional: it compiles compat_kernel to machine code.
+# Without it, the kernel below just runs as normal Python.
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
 # ============================================
 # WHAT IS THIS FILE?
 # ============================================
@@ -24,32 +36,41 @@ import numpy as np
 # acousticness: Acoustic vs electronic (0=electronic, 1=acoustic)
 # instrumentalness: Has vocals? (0=vocals, 1=no vocals)
 
+#
+# Each user is one numpy array: one row per song, one column per
+# feature (same order as FEATURES). A single block of numbers is much
+# faster to work with than a list of dicts.
+
+# The order features appear in every vector / matrix column
+FEATURES = ("energy", "danceability", "valence", "acousticness", "instrumentalness")
+
 # User A: Party person - likes energetic, happy, dance music
-user_a_songs = [
-    {"energy": 0.8, "danceability": 0.9, "valence": 0.7, "acousticness": 0.1, "instrumentalness": 0.0},
-    {"energy": 0.9, "danceability": 0.8, "valence": 0.8, "acousticness": 0.2, "instrumentalness": 0.1},
-    {"energy": 0.7, "danceability": 0.85, "valence": 0.6, "acousticness": 0.15, "instrumentalness": 0.0},
-    {"energy": 0.85, "danceability": 0.75, "valence": 0.9, "acousticness": 0.1, "instrumentalness": 0.0},
-    {"energy": 0.75, "danceability": 0.95, "valence": 0.7, "acousticness": 0.05, "instrumentalness": 0.1},
-]
+USER_A = np.array([
+    # energy, dance, valence, acoustic, instrumental
+    [0.8,  0.9,  0.7, 0.1,  0.0],
+    [0.9,  0.8,  0.8, 0.2,  0.1],
+    [0.7,  0.85, 0.6, 0.15, 0.0],
+    [0.85, 0.75, 0.9, 0.1,  0.0],
+    [0.75, 0.95, 0.7, 0.05, 0.1],
+], dtype=np.float32)
 
 # User B: Also party person (should be HIGH compatibility with A)
-user_b_songs = [
-    {"energy": 0.85, "danceability": 0.8, "valence": 0.75, "acousticness": 0.15, "instrumentalness": 0.0},
-    {"energy": 0.9, "danceability": 0.85, "valence": 0.7, "acousticness": 0.1, "instrumentalness": 0.0},
-    {"energy": 0.75, "danceability": 0.9, "valence": 0.65, "acousticness": 0.2, "instrumentalness": 0.1},
-    {"energy": 0.8, "danceability": 0.7, "valence": 0.8, "acousticness": 0.1, "instrumentalness": 0.0},
-    {"energy": 0.7, "danceability": 0.88, "valence": 0.75, "acousticness": 0.1, "instrumentalness": 0.05},
-]
+USER_B = np.array([
+    [0.85, 0.8,  0.75, 0.15, 0.0],
+    [0.9,  0.85, 0.7,  0.1,  0.0],
+    [0.75, 0.9,  0.65, 0.2,  0.1],
+    [0.8,  0.7,  0.8,  0.1,  0.0],
+    [0.7,  0.88, 0.75, 0.1,  0.05],
+], dtype=np.float32)
 
 # User C: Sad acoustic lover (should be LOW compatibility with A)
-user_c_songs = [
-    {"energy": 0.2, "danceability": 0.3, "valence": 0.2, "acousticness": 0.9, "instrumentalness": 0.3},
-    {"energy": 0.15, "danceability": 0.25, "valence": 0.1, "acousticness": 0.95, "instrumentalness": 0.4},
-    {"energy": 0.3, "danceability": 0.4, "valence": 0.25, "acousticness": 0.85, "instrumentalness": 0.2},
-    {"energy": 0.25, "danceability": 0.35, "valence": 0.15, "acousticness": 0.9, "instrumentalness": 0.35},
-    {"energy": 0.1, "danceability": 0.2, "valence": 0.3, "acousticness": 0.92, "instrumentalness": 0.5},
-]
+USER_C = np.array([
+    [0.2,  0.3,  0.2,  0.9,  0.3],
+    [0.15, 0.25, 0.1,  0.95, 0.4],
+    [0.3,  0.4,  0.25, 0.85, 0.2],
+    [0.25, 0.35, 0.15, 0.9,  0.35],
+    [0.1,  0.2,  0.3,  0.92, 0.5],
+], dtype=np.float32)
 
 
 # ============================================
@@ -69,33 +90,55 @@ user_c_songs = [
 # We can compare vectors to see how similar they are!
 
 
+# Bars for the printed profile: _BARS[i] is i blocks (0 to 20)
+_BARS = tuple("█" * i for i in range(21))
+
+
 # ============================================
 # STEP 1: CREATE USER PROFILE
 # ============================================
 # Average all songs to get one "profile" for the user
 
-def create_user_profile(songs):
+def songs_to_matrix(songs):
     """
-    Input: List of songs (each song is a dict of features)
-    Output: One dict with average of each feature
-    
+    Input: List of songs (each song is a dict of features),
+           or a song matrix already (returned as-is)
+    Output: 2D numpy array, one row per song, one column per feature
+
     Example:
     songs = [{"energy": 0.8, ...}, {"energy": 0.6, ...}]
-    output = {"energy": 0.7, ...}  (average)
+    output = [[0.8, ...],
+              [0.6, ...]]   shape = (2, 5)
     """
-    features = ["energy", "danceability", "valence", "acousticness", "instrumentalness"]
+    if isinstance(songs, np.ndarray):
+        return songs
     
-    profile = {}
-    for feature in features:
-        # Sum all values for this feature
-        total = 0
-        for song in songs:
-            total += song[feature]
-        
-        # Divide by number of songs to get average
-        profile[feature] = total / len(songs)
+    # Read every value straight into one contiguous array
+    # (no intermediate Python list)
+    values = (song[f] for song in songs for f in FEATURES)
+    matrix = np.fromiter(values, dtype=np.float32, count=len(songs) * len(FEATURES))
+    return matrix.reshape(-1, len(FEATURES))
+
+
+def create_user_profile(songs):
+    """
+    Input: Song matrix (one row per song, columns in FEATURES order)
+    Output: numpy array with average of each feature
     
-    return profile
+    Example:
+    songs = [[0.8, ...], [0.6, ...]]
+    output = [0.7, ...]  (average)
+    """
+    # Average each column = average of each feature over all songs
+    return songs.mean(axis=0)
+
+
+def _profile_dict(vec):
+    """
+    Input: Profile vector [0.8, 0.9, ...]
+    Output: {"energy": 0.8, "danceability": 0.9, ...} (for printing)
+    """
+    return dict(zip(FEATURES, vec))
 
 
 # ============================================
@@ -106,10 +149,12 @@ def create_user_profile(songs):
 def profile_to_vector(profile):
     """
     Input: {"energy": 0.8, "danceability": 0.9, ...}
+           (or a numpy array, which is returned as-is)
     Output: [0.8, 0.9, ...] as numpy array
     """
-    features = ["energy", "danceability", "valence", "acousticness", "instrumentalness"]
-    return np.array([profile[f] for f in features])
+    if isinstance(profile, np.ndarray):
+        return profile
+    return np.fromiter((profile[f] for f in FEATURES), dtype=np.float32, count=len(FEATURES))
 
 
 # ============================================
@@ -141,21 +186,72 @@ def cosine_similarity(vec_a, vec_b):
     Input: Two numpy arrays
     Output: Number between -1 and 1
     """
-    # Dot product: multiply corresponding elements and sum
-    # [1,2,3] · [4,5,6] = 1*4 + 2*5 + 3*6 = 32
-    dot_product = np.dot(vec_a, vec_b)
-    
     # Magnitude: length of vector
     # |[3,4]| = sqrt(3² + 4²) = 5
-    magnitude_a = np.linalg.norm(vec_a)
-    magnitude_b = np.linalg.norm(vec_b)
+    # A vector dotted with itself is its squared magnitude, so
+    # |A| × |B| = sqrt((A · A) × (B · B))  (only one sqrt needed)
+    denom_sq = float(np.vdot(vec_a, vec_a)) * float(np.vdot(vec_b, vec_b))
     
-    # Avoid division by zero
-    if magnitude_a == 0 or magnitude_b == 0:
-        return 0
+    # Avoid division by zero (zero if either vector is all zeros)
+    if denom_sq == 0.0:
+        return 0.0
+    
+    # Dot product: multiply corresponding elements and sum
+    # [1,2,3] · [4,5,6] = 1*4 + 2*5 + 3*6 = 32
+    dot_product = float(np.dot(vec_a, vec_b))
     
     # Cosine similarity formula
-    return dot_product / (magnitude_a * magnitude_b)
+    return dot_product / math.sqrt(denom_sq)
+
+
+# ============================================
+# SPEED-UP: PROFILE + SIMILARITY IN ONE PASS
+# ============================================
+# For tiny 5-number vectors, calling numpy several times costs more
+# than the math itself. This kernel does the averaging AND the
+# cosine similarity in one compiled loop.
+
+@njit(cache=True, fastmath=True)
+def compat_kernel(A, B):
+    """
+    Input: Two song matrices (songs x features)
+    Output: (similarity, profile of A, profile of B)
+    """
+    n_a = A.shape[0]
+    n_b = B.shape[0]
+    n_features = A.shape[1]
+    
+    mean_a = np.empty(n_features)
+    mean_b = np.empty(n_features)
+    dot = 0.0
+    norm_a_sq = 0.0
+    norm_b_sq = 0.0
+    
+    for i in range(n_features):
+        # Total of feature i for each user
+        sa = 0.0
+        for row in range(n_a):
+            sa += A[row, i]
+        sb = 0.0
+        for row in range(n_b):
+            sb += B[row, i]
+        
+        # Build up A · B, |A|² and |B|² as we go.
+        # Cosine ignores vector length, so the totals give the same
+        # answer as the averages - no need to divide by the song count.
+        dot += sa * sb
+        norm_a_sq += sa * sa
+        norm_b_sq += sb * sb
+        
+        # Averages are only needed for the returned profiles
+        mean_a[i] = sa / n_a
+        mean_b[i] = sb / n_b
+    
+    denom_sq = norm_a_sq * norm_b_sq
+    if denom_sq == 0:
+        return 0.0, mean_a, mean_b
+    
+    return dot / math.sqrt(denom_sq), mean_a, mean_b
 
 
 # ============================================
@@ -165,25 +261,57 @@ def cosine_similarity(vec_a, vec_b):
 def calculate_compatibility(user1_songs, user2_songs):
     """
     Main function!
-    Input: Two users' song lists
-    Output: Compatibility percentage (0-100)
+    Input: Two users' song matrices (or song lists)
+    Output: Compatibility percentage (0-100) and both profile vectors
     """
-    # Create profiles (average of songs)
-    profile1 = create_user_profile(user1_songs)
-    profile2 = create_user_profile(user2_songs)
+    # Make sure both users are song matrices
+    mat1 = songs_to_matrix(user1_songs)
+    mat2 = songs_to_matrix(user2_songs)
     
-    # Convert to vectors
-    vec1 = profile_to_vector(profile1)
-    vec2 = profile_to_vector(profile2)
+    # The compiled kernel doesn't check array bounds, so make sure
+    # both matrices have exactly one column per feature first
+    for mat in (mat1, mat2):
+        if mat.ndim != 2 or mat.shape[1] != len(FEATURES):
+            raise ValueError(
+                f"song matrix must have shape (n_songs, {len(FEATURES)}), got {mat.shape}"
+            )
     
-    # Calculate cosine similarity
-    similarity = cosine_similarity(vec1, vec2)
+    # Profiles (average of songs) + cosine similarity, in one go
+    similarity, vec1, vec2 = compat_kernel(mat1, mat2)
     
     # Convert to 0-100 scale
     # similarity is -1 to 1, we want 0 to 100
     compatibility = (similarity + 1) / 2 * 100
     
-    return compatibility, profile1, profile2
+    return compatibility, vec1, vec2
+
+
+def pairwise_compatibility(user_song_lists):
+    """
+    Input: List of N users' song matrices (or song lists)
+    Output: N x N numpy array, entry [i, j] = compatibility (0-100)
+            between user i and user j
+    
+    Instead of calling calculate_compatibility N² times, we stack all
+    profiles into one matrix P (one row per user) and do a single
+    matrix multiply: after scaling every row to length 1,
+    (P @ P.T)[i, j] is exactly the cosine similarity of users i and j.
+    """
+    # Column totals instead of averages: rows get scaled to length 1
+    # anyway, so dividing by the song count first changes nothing
+    # (always float, so the in-place division below works for int input)
+    P = np.vstack([songs_to_matrix(songs).sum(axis=0) for songs in user_song_lists])
+    P = P.astype(np.float32, copy=False)
+    
+    # Scale each row to length 1 (leave all-zero rows alone)
+    norms = np.sqrt(np.einsum("ij,ij->i", P, P))
+    norms[norms == 0] = 1
+    P /= norms[:, None]
+    
+    similarity = P @ P.T
+    
+    # Convert to 0-100 scale
+    return (similarity + 1) * 50
 
 
 # ============================================
@@ -196,22 +324,22 @@ if __name__ == "__main__":
     print("=" * 50)
     
     # Test 1: Similar users
-    compat_ab, prof_a, prof_b = calculate_compatibility(user_a_songs, user_b_songs)
+    compat_ab, prof_a, prof_b = calculate_compatibility(USER_A, USER_B)
     print(f"\n👯 User A vs User B (both party people)")
     print(f"   Compatibility: {compat_ab:.1f}%")
     
     # Test 2: Different users
-    compat_ac, prof_a, prof_c = calculate_compatibility(user_a_songs, user_c_songs)
+    compat_ac, prof_a, prof_c = calculate_compatibility(USER_A, USER_C)
     print(f"\n😢 User A vs User C (party vs sad)")
     print(f"   Compatibility: {compat_ac:.1f}%")
     
     # Show what the profiles look like
     print(f"\n📊 User A's Music Profile:")
-    for key, val in prof_a.items():
-        bar = "█" * int(val * 20)
+    for key, val in _profile_dict(prof_a).items():
+        bar = _BARS[min(int(val * 20), 20)]
         print(f"   {key:18} {bar} {val:.2f}")
     
     print(f"\n📊 User C's Music Profile:")
-    for key, val in prof_c.items():
-        bar = "█" * int(val * 20)
+    for key, val in _profile_dict(prof_c).items():
+        bar = _BARS[min(int(val * 20), 20)]
         print(f"   {key:18} {bar} {val:.2f}")
\ No newline at end of file
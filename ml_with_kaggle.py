@@ -8,11 +8,15 @@
 # Download from: https://www.kaggle.com/datasets/maharshipandya/-spotify-tracks-dataset
 # ============================================
 
+import math
+import sys
+from pathlib import Path
+
+import joblib
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -41,72 +45,57 @@ def create_sample_data():
     Create sample data if Kaggle dataset not available.
     This simulates what the real dataset looks like.
     """
-    np.random.seed(42)
-    
-    # Simulate different music styles
-    data = []
-    
-    # Pop songs (high danceability, high valence, medium energy)
-    for i in range(50):
-        data.append({
-            'track_name': f'Pop Song {i+1}',
-            'artists': f'Pop Artist {i%10}',
-            'track_genre': 'pop',
-            'popularity': np.random.randint(60, 100),
-            'danceability': np.random.uniform(0.6, 0.9),
-            'energy': np.random.uniform(0.5, 0.8),
-            'valence': np.random.uniform(0.5, 0.9),
-            'acousticness': np.random.uniform(0.1, 0.4),
-            'instrumentalness': np.random.uniform(0.0, 0.1),
-            'tempo': np.random.uniform(100, 130)
-        })
-    
-    # Rock songs (high energy, medium danceability)
-    for i in range(50):
-        data.append({
-            'track_name': f'Rock Song {i+1}',
-            'artists': f'Rock Artist {i%10}',
-            'track_genre': 'rock',
-            'popularity': np.random.randint(40, 80),
-            'danceability': np.random.uniform(0.3, 0.6),
-            'energy': np.random.uniform(0.7, 1.0),
-            'valence': np.random.uniform(0.3, 0.7),
-            'acousticness': np.random.uniform(0.1, 0.3),
-            'instrumentalness': np.random.uniform(0.0, 0.3),
-            'tempo': np.random.uniform(110, 150)
-        })
-    
-    # Acoustic/Indie songs (high acousticness, lower energy)
-    for i in range(50):
-        data.append({
-            'track_name': f'Indie Song {i+1}',
-            'artists': f'Indie Artist {i%10}',
-            'track_genre': 'indie',
-            'popularity': np.random.randint(20, 60),
-            'danceability': np.random.uniform(0.3, 0.6),
-            'energy': np.random.uniform(0.2, 0.5),
-            'valence': np.random.uniform(0.2, 0.6),
-            'acousticness': np.random.uniform(0.6, 0.95),
-            'instrumentalness': np.random.uniform(0.0, 0.2),
-            'tempo': np.random.uniform(80, 120)
+    rng = np.random.default_rng(42)
+    n = 50  # songs per genre
+    
+    def make_genre(name, artist, genre, popularity, danceability, energy,
+                   valence, acousticness, instrumentalness, tempo):
+        # One vectorized random call per column (not one per song)
+        return pd.DataFrame({
+            'track_name': [f'{name} Song {i+1}' for i in range(n)],
+            'artists': [f'{artist} {i%10}' for i in range(n)],
+            'track_genre': genre,
+            'popularity': rng.integers(*popularity, size=n),
+            'danceability': rng.uniform(*danceability, size=n),
+            'energy': rng.uniform(*energy, size=n),
+            'valence': rng.uniform(*valence, size=n),
+            'acousticness': rng.uniform(*acousticness, size=n),
+            'instrumentalness': rng.uniform(*instrumentalness, size=n),
+            'tempo': rng.uniform(*tempo, size=n),
         })
     
-    # Electronic/EDM songs (high energy, high danceability, low acousticness)
-    for i in range(50):
-        data.append({
-            'track_name': f'EDM Song {i+1}',
-            'artists': f'DJ Artist {i%10}',
-            'track_genre': 'electronic',
-            'popularity': np.random.randint(50, 90),
-            'danceability': np.random.uniform(0.7, 0.95),
-            'energy': np.random.uniform(0.8, 1.0),
-            'valence': np.random.uniform(0.4, 0.8),
-            'acousticness': np.random.uniform(0.0, 0.1),
-            'instrumentalness': np.random.uniform(0.3, 0.9),
-            'tempo': np.random.uniform(120, 150)
-        })
-    
-    return pd.DataFrame(data)
+    # Simulate different music styles
+    blocks = [
+        # Pop songs (high danceability, high valence, medium energy)
+        make_genre('Pop', 'Pop Artist', 'pop', popularity=(60, 100),
+                   danceability=(0.6, 0.9), energy=(0.5, 0.8),
+                   valence=(0.5, 0.9), acousticness=(0.1, 0.4),
+                   instrumentalness=(0.0, 0.1), tempo=(100, 130)),
+        
+        # Rock songs (high energy, medium danceability)
+        make_genre('Rock', 'Rock Artist', 'rock', popularity=(40, 80),
+                   danceability=(0.3, 0.6), energy=(0.7, 1.0),
+                   valence=(0.3, 0.7), acousticness=(0.1, 0.3),
+                   instrumentalness=(0.0, 0.3), tempo=(110, 150)),
+        
+        # Acoustic/Indie songs (high acousticness, lower energy)
+        make_genre('Indie', 'Indie Artist', 'indie', popularity=(20, 60),
+                   danceability=(0.3, 0.6), energy=(0.2, 0.5),
+                   valence=(0.2, 0.6), acousticness=(0.6, 0.95),
+                   instrumentalness=(0.0, 0.2), tempo=(80, 120)),
+        
+        # Electronic/EDM songs (high energy, high danceability, low acousticness)
+        make_genre('EDM', 'DJ Artist', 'electronic', popularity=(50, 90),
+                   danceability=(0.7, 0.95), energy=(0.8, 1.0),
+                   valence=(0.4, 0.8), acousticness=(0.0, 0.1),
+                   instrumentalness=(0.3, 0.9), tempo=(120, 150)),
+    ]
+    
+    # Audio features fit easily in float32 (half the memory of float64)
+    df = pd.concat(blocks, ignore_index=True)
+    feature_cols = ['danceability', 'energy', 'valence', 'acousticness',
+                    'instrumentalness', 'tempo']
+    return df.astype({col: np.float32 for col in feature_cols})
 
 
 # ============================================
@@ -160,7 +149,7 @@ def normalize_features(X):
     Formula: z = (x - mean) / std
     """
     scaler = StandardScaler()
-    X_normalized = scaler.fit_transform(X)
+    X_normalized = scaler.fit_transform(X).astype(np.float32, copy=False)
     
     print("\n🔧 Normalization:")
     print(f"   Before: tempo might be 120, danceability might be 0.8")
@@ -169,11 +158,65 @@ def normalize_features(X):
     return X_normalized, scaler
 
 
+# ============================================
+# SPEED-UP: CACHE FEATURES ON DISK
+# ============================================
+# Extracting features and fitting the scaler on ~170k songs takes a
+# while. We save the results in .cache/ next to this file and reuse
+# them until dataset.csv changes (different modification time or size).
+
+_cache_path = Path(__file__).resolve().parent / '.cache' / 'ml_features.joblib'
+
+
+def _dataset_key(filepath):
+    """Identify a dataset file by full path, modification time and size."""
+    path = Path(filepath).resolve()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (str(path), stat.st_mtime, stat.st_size)
+
+
+def prepare_features(df, filepath='dataset.csv'):
+    """
+    Extract + normalize features, using the disk cache when it is
+    still fresh for `filepath`.
+    
+    Sample data (no dataset file) is never cached.
+    """
+    key = _dataset_key(filepath)
+    
+    if key is not None and _cache_path.exists():
+        try:
+            cached = joblib.load(_cache_path)
+        except Exception:
+            cached = None
+        if cached is not None and cached.get('key') == key:
+            print(f"\n⚡ Loaded cached features from {_cache_path}")
+            return cached['X'], cached['X_normalized'], cached['scaler'], cached['feature_names']
+    
+    X, feature_names = extract_features(df)
+    X_normalized, scaler = normalize_features(X)
+    
+    if key is not None:
+        _cache_path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump({
+            'key': key,
+            'X': X,
+            'X_normalized': X_normalized.astype(np.float32, copy=False),
+            'scaler': scaler,
+            'feature_names': feature_names,
+        }, _cache_path)
+    
+    return X, X_normalized, scaler, feature_names
+
+
 # ============================================
 # ML CONCEPT 3: USER PROFILE CREATION
 # ============================================
 
-def create_user_profile(df, liked_songs_indices):
+def create_user_profile(X, liked_songs_indices):
     """
     CREATE USER PROFILE
     
@@ -181,18 +224,26 @@ def create_user_profile(df, liked_songs_indices):
     
     If you like 10 songs, we average their features
     to create one vector representing your taste.
-    """
-    features = ['danceability', 'energy', 'valence', 'acousticness', 
-                'instrumentalness', 'tempo']
-    available = [f for f in features if f in df.columns]
     
-    # Get features of liked songs
-    liked_songs = df.iloc[liked_songs_indices][available]
+    X is the feature matrix from extract_features
+    (one row per song), so no DataFrame work is needed.
+    """
+    # Get features of liked songs and average them
+    return X[liked_songs_indices].mean(axis=0)
+
+
+def normalize_profile(profile, scaler):
+    """
+    Put a user profile on the same scale as the songs,
+    then scale it to length 1 (a "unit vector").
     
-    # Average them
-    profile = liked_songs.mean().values
+    Do this once per user and reuse the result for
+    compatibility and recommendations.
+    """
+    normalized = scaler.transform(profile[None])[0]
+    norm = np.linalg.norm(normalized)
     
-    return profile, available
+    return normalized / norm if norm != 0 else normalized
 
 
 # ============================================
@@ -209,14 +260,12 @@ def calculate_similarity(profile1, profile2):
     - 0.0 = perpendicular = unrelated
     - -1.0 = opposite direction = opposite taste
     
-    We reshape to 2D because sklearn expects it.
+    Formula: (A · B) / sqrt((A · A) × (B · B))
     """
-    p1 = profile1.reshape(1, -1)
-    p2 = profile2.reshape(1, -1)
+    num = float(np.dot(profile1, profile2))
+    den = math.sqrt(float(np.vdot(profile1, profile1)) * float(np.vdot(profile2, profile2)))
     
-    similarity = cosine_similarity(p1, p2)[0][0]
-    
-    return similarity
+    return 0.0 if den == 0 else num / den
 
 
 # ============================================
@@ -236,8 +285,12 @@ def cluster_songs(X, n_clusters=5):
     4. Repeat until centroids stop moving
     
     Result: Songs with similar vibes are in same cluster.
+    
+    We use MiniBatchKMeans: each step uses a small random batch
+    of songs instead of all of them, so it stays fast on the
+    full Kaggle dataset (~170k songs).
     """
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=1024, n_init=3, random_state=42)
     clusters = kmeans.fit_predict(X)
     
     return clusters, kmeans
@@ -247,29 +300,49 @@ def cluster_songs(X, n_clusters=5):
 # ML CONCEPT 6: RECOMMENDATIONS
 # ============================================
 
-def recommend_songs(df, user_profile, scaler, feature_names, n_recommendations=5):
+def get_unit_corpus(X_normalized):
+    """
+    Scale each normalized song row to length 1.
+    
+    With unit-length rows, cosine similarity against a unit-length
+    profile is just a dot product. Compute this once and pass it to
+    every recommend_songs call. The result is float32 (fast BLAS path).
+    """
+    X_normalized = X_normalized.astype(np.float32, copy=False)
+    row_norms = np.linalg.norm(X_normalized, axis=1)
+    
+    safe_norms = np.where(row_norms == 0, 1, row_norms)
+    return X_normalized / safe_norms[:, None]
+
+
+def recommend_songs(df, profile_unit, X_unit, n_recommendations=5):
     """
     CONTENT-BASED RECOMMENDATIONS
     
     Find songs most similar to user's taste profile.
     
     Steps:
-    1. Normalize user profile (same scale as songs)
+    1. Normalize user profile once (see normalize_profile)
     2. Calculate similarity between user and every song
     3. Return top N most similar songs
-    """
-    # Get all song features
-    X = df[feature_names].values
-    X_normalized = scaler.transform(X)
-    
-    # Normalize user profile
-    user_normalized = scaler.transform(user_profile.reshape(1, -1))
     
-    # Calculate similarity to each song
-    similarities = cosine_similarity(user_normalized, X_normalized)[0]
-    
-    # Get top N indices
-    top_indices = similarities.argsort()[::-1][:n_recommendations]
+    X_unit comes from get_unit_corpus. Both profile_unit and the
+    rows of X_unit have length 1, so their dot product IS the
+    cosine similarity.
+    """
+    # Calculate similarity to each song: one matrix-vector product.
+    # Match the corpus dtype (float32) so numpy stays on the fast path.
+    profile_unit = profile_unit.astype(X_unit.dtype, copy=False)
+    similarities = X_unit @ profile_unit
+    
+    # Get top N indices: partition out the N best (no full sort),
+    # then sort just those N from most to least similar
+    k = min(n_recommendations, len(similarities))
+    if k < len(similarities):
+        part = np.argpartition(-similarities, k)[:k]
+    else:
+        part = np.arange(len(similarities))
+    top_indices = part[np.argsort(-similarities[part])]
     
     recommendations = df.iloc[top_indices][['track_name', 'artists', 'track_genre']].copy()
     recommendations['similarity'] = similarities[top_indices]
@@ -281,35 +354,32 @@ def recommend_songs(df, user_profile, scaler, feature_names, n_recommendations=5
 # MAIN: RUN EVERYTHING
 # ============================================
 
-def main():
+def _load(title):
+    """Print the header and load the dataset."""
     print("=" * 60)
-    print("🎵 MUSIC ML LEARNING - Using Kaggle Dataset")
+    print(title)
     print("=" * 60)
     
-    # Step 1: Load data
     df = load_data()
     print(f"\n📁 Dataset shape: {df.shape}")
     print(f"   Columns: {list(df.columns)}")
     
-    # Step 2: Extract features
-    X, feature_names = extract_features(df)
-    print(f"\n📊 Feature matrix shape: {X.shape}")
-    
-    # Step 3: Normalize
-    X_normalized, scaler = normalize_features(X)
-    
-    # Step 4: Create two simulated users
+    return df
+
+
+def _simulate_users(df, X, feature_names):
+    """Build and print the profiles of the two simulated users."""
     print("\n" + "=" * 60)
     print("👤 SIMULATING TWO USERS")
     print("=" * 60)
     
     # User A likes pop and EDM (indices 0-9 are pop, 150-159 are EDM in sample)
     user_a_likes = list(range(0, 10)) + list(range(150, 160)) if len(df) >= 160 else list(range(0, min(20, len(df))))
-    profile_a, _ = create_user_profile(df, user_a_likes)
+    profile_a = create_user_profile(X, user_a_likes)
     
     # User B likes indie and acoustic (indices 100-119 in sample)
     user_b_likes = list(range(100, 120)) if len(df) >= 120 else list(range(max(0, len(df)-20), len(df)))
-    profile_b, _ = create_user_profile(df, user_b_likes)
+    profile_b = create_user_profile(X, user_b_likes)
     
     print(f"\n👤 User A Profile (Pop/EDM lover):")
     for i, name in enumerate(feature_names):
@@ -319,16 +389,11 @@ def main():
     for i, name in enumerate(feature_names):
         print(f"   {name}: {profile_b[i]:.3f}")
     
-    # Step 5: Calculate compatibility
-    print("\n" + "=" * 60)
-    print("💕 COMPATIBILITY CALCULATION")
-    print("=" * 60)
-    
-    # Normalize profiles for fair comparison
-    profile_a_norm = scaler.transform(profile_a.reshape(1, -1))[0]
-    profile_b_norm = scaler.transform(profile_b.reshape(1, -1))[0]
-    
-    similarity = calculate_similarity(profile_a_norm, profile_b_norm)
+    return profile_a, profile_b
+
+
+def _print_compatibility(similarity):
+    """Print the similarity, the 0-100 score and a verdict."""
     compatibility = (similarity + 1) / 2 * 100  # Convert to 0-100
     
     print(f"\n🎯 Cosine Similarity: {similarity:.3f}")
@@ -340,6 +405,71 @@ def main():
         print("   Status: Some overlap 🎵")
     else:
         print("   Status: Different tastes 🌈")
+
+
+# Known upper bound of each feature (tempo is in BPM, the rest are 0-1)
+_FEATURE_MAX = {'tempo': 250.0}
+
+
+def scale_to_fixed_range(profile, feature_names):
+    """
+    Map each feature from its known range onto -1 to +1.
+    
+    This is a NO-FIT alternative to StandardScaler: tempo no longer
+    swamps the 0-1 features, and values below the middle of the range
+    become negative, so opposite tastes can get a negative similarity.
+    """
+    maxima = np.array([_FEATURE_MAX.get(name, 1.0) for name in feature_names])
+    return profile / maxima * 2 - 1
+
+
+def compat_only():
+    """
+    FAST PATH: only compare the two users.
+    
+    Skips fitting the scaler (and clustering / recommendations).
+    Profiles are put on a fixed -1 to +1 scale instead
+    (see scale_to_fixed_range), which needs no pass over the corpus.
+    """
+    df = _load("🎵 MUSIC ML LEARNING - Compatibility Only")
+    
+    X, feature_names = extract_features(df)
+    print(f"\n📊 Feature matrix shape: {X.shape}")
+    
+    profile_a, profile_b = _simulate_users(df, X, feature_names)
+    
+    print("\n" + "=" * 60)
+    print("💕 COMPATIBILITY CALCULATION (fixed feature ranges)")
+    print("=" * 60)
+    
+    similarity = calculate_similarity(scale_to_fixed_range(profile_a, feature_names),
+                                      scale_to_fixed_range(profile_b, feature_names))
+    _print_compatibility(similarity)
+
+
+def full_pipeline():
+    """Run every step: normalization, compatibility, clustering, recommendations."""
+    # Step 1: Load data
+    df = _load("🎵 MUSIC ML LEARNING - Using Kaggle Dataset")
+    
+    # Step 2 + 3: Extract and normalize features (cached on disk)
+    X, X_normalized, scaler, feature_names = prepare_features(df)
+    print(f"\n📊 Feature matrix shape: {X.shape}")
+    
+    # Step 4: Create two simulated users
+    profile_a, profile_b = _simulate_users(df, X, feature_names)
+    
+    # Step 5: Calculate compatibility
+    print("\n" + "=" * 60)
+    print("💕 COMPATIBILITY CALCULATION")
+    print("=" * 60)
+    
+    # Normalize profiles once for fair comparison (reused below)
+    profile_a_unit = normalize_profile(profile_a, scaler)
+    profile_b_unit = normalize_profile(profile_b, scaler)
+    
+    similarity = calculate_similarity(profile_a_unit, profile_b_unit)
+    _print_compatibility(similarity)
     
     # Step 6: Clustering
     print("\n" + "=" * 60)
@@ -350,19 +480,27 @@ def main():
     df['cluster'] = clusters
     
     print("\n🎨 Songs grouped into 4 clusters:")
-    for i in range(4):
-        cluster_songs_df = df[df['cluster'] == i]
-        if 'track_genre' in df.columns:
-            genres = cluster_songs_df['track_genre'].value_counts().head(2)
-            print(f"\n   Cluster {i}: {len(cluster_songs_df)} songs")
-            print(f"   Main genres: {dict(genres)}")
+    if 'track_genre' in df.columns:
+        # Count songs per (cluster, genre) in one pass,
+        # then keep the 2 biggest genres of each cluster
+        cluster_sizes = np.bincount(clusters, minlength=4)
+        top_per_cluster = (df.groupby(['cluster', 'track_genre']).size()
+                           .rename('n').reset_index()
+                           .sort_values(['cluster', 'n'], ascending=[True, False])
+                           .groupby('cluster').head(2))
+        for i in range(4):
+            top = top_per_cluster[top_per_cluster['cluster'] == i]
+            genres = dict(zip(top['track_genre'], top['n']))
+            print(f"\n   Cluster {i}: {cluster_sizes[i]} songs")
+            print(f"   Main genres: {genres}")
     
     # Step 7: Recommendations
     print("\n" + "=" * 60)
     print("🎧 RECOMMENDATIONS FOR USER A")
     print("=" * 60)
     
-    recommendations = recommend_songs(df, profile_a, scaler, feature_names, n_recommendations=5)
+    X_unit = get_unit_corpus(X_normalized)
+    recommendations = recommend_songs(df, profile_a_unit, X_unit, n_recommendations=5)
     print("\nTop 5 recommended songs:")
     for i, row in recommendations.iterrows():
         print(f"   {row['track_name']} by {row['artists']}")
@@ -384,5 +522,13 @@ def main():
     """)
 
 
+def main():
+    full_pipeline()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python ml_with_kaggle.py --compat-only  → skip normalization etc.
+    if "--compat-only" in sys.argv:
+        compat_only()
+    else:
+        main()